@@ -10,17 +10,26 @@ class Config(commands.Cog):
         self.bot = bot
         self.config_file = "data/config.json"
         os.makedirs("data", exist_ok=True)
-        self.config = self.load_config()
+        self.store = bot.store
+        self.config = {}
+
+    async def cog_load(self):
+        await self.store.import_once("config", self.load_config)
+        self.config = await self.store.items("config")
+        self.store.subscribe("config", self.reload_guild_config)
 
     def load_config(self):
         if os.path.exists(self.config_file):
             with open(self.config_file, "r") as f:
-                return json.load(f)
+                return {"kv": json.load(f)}
         return {}
 
-    def save_config(self):
-        with open(self.config_file, "w") as f:
-            json.dump(self.config, f, indent=4)
+    async def save_config(self, guild_id):
+        guild_id = str(guild_id)
+        await self.store.set("config", guild_id, self.config.get(guild_id, {}))
+
+    async def reload_guild_config(self, guild_id):
+        self.config[guild_id] = await self.store.get("config", guild_id, {})
 
     def get_guild_config(self, guild_id):
         guild_id = str(guild_id)
@@ -32,6 +41,9 @@ class Config(commands.Cog):
         guild_config = self.get_guild_config(guild_id)
         return guild_config.get("markov_channels", [])
 
+    def cog_unload(self):
+        self.store.unsubscribe("config", self.reload_guild_config)
+
     @app_commands.command(name="config", description="configure bot settings")
     @app_commands.describe(
         key="the setting to configure", channels="channels to use (for markov channels)"
@@ -64,7 +76,7 @@ class Config(commands.Cog):
                 return
 
             guild_config["markov_channels"] = channel_ids
-            self.save_config()
+            await self.save_config(interaction.guild_id)
 
             channel_mentions = [f"<#{cid}>" for cid in channel_ids]
             await interaction.response.send_message(
@@ -1,10 +1,14 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+import asyncio
 import json
 import re
+import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+
+from names import name_candidates
 
 
 class CookiesCog(commands.Cog):
@@ -13,8 +17,7 @@ class CookiesCog(commands.Cog):
         self.data_file = Path("data/cookies.json")
         self.data_file.parent.mkdir(exist_ok=True)
 
-        self.cookies: Dict[int, Dict[int, int]] = {}
-        self.load_data()
+        self.store = bot.store
 
         self.thank_patterns = [
             r"\bthank",
@@ -36,51 +39,33 @@ class CookiesCog(commands.Cog):
         ]
         self.pattern = re.compile("|".join(self.thank_patterns), re.IGNORECASE)
 
-    def load_data(self) -> None:
+        self.max_name_lookups = 2
+        self.name_cache_ttl = 60.0
+        self.name_cache: Dict[Tuple[int, str], Tuple[float, List[discord.Member]]] = {}
+
+    async def cog_load(self) -> None:
+        await self.store.import_once("cookies", self.load_data)
+
+    def load_data(self) -> dict:
         if self.data_file.exists():
             try:
                 with open(self.data_file, "r") as f:
-                    data = json.load(f)
-                    self.cookies = {
-                        int(k): {int(u): c for u, c in v.items()}
-                        for k, v in data.items()
-                    }
+                    return {"counters": json.load(f)}
             except Exception as e:
                 print(f"failed to load cookie data: {e}")
+        return {}
 
-    def save_data(self) -> None:
-        try:
-            with open(self.data_file, "w") as f:
-                json.dump(
-                    {
-                        str(k): {str(u): c for u, c in v.items()}
-                        for k, v in self.cookies.items()
-                    },
-                    f,
-                )
-        except Exception as e:
-            print(f"failed to save cookie data: {e}")
-
-    def get_cookies(self, guild_id: int, user_id: int) -> int:
-        return self.cookies.get(guild_id, {}).get(user_id, 0)
+    async def get_cookies(self, guild_id: int, user_id: int) -> int:
+        return await self.store.get_counter("cookies", guild_id, user_id)
 
-    def add_cookie(self, guild_id: int, user_id: int) -> None:
-        if guild_id not in self.cookies:
-            self.cookies[guild_id] = {}
+    async def add_cookie(self, guild_id: int, user_id: int) -> None:
+        await self.store.increment("cookies", guild_id, user_id)
 
-        self.cookies[guild_id][user_id] = self.cookies[guild_id].get(user_id, 0) + 1
-        self.save_data()
-
-    def remove_cookie(self, guild_id: int, user_id: int) -> bool:
-        if guild_id not in self.cookies or user_id not in self.cookies[guild_id]:
-            return False
-
-        if self.cookies[guild_id][user_id] <= 0:
-            return False
-
-        self.cookies[guild_id][user_id] -= 1
-        self.save_data()
-        return True
+    async def remove_cookie(self, guild_id: int, user_id: int) -> bool:
+        remaining = await self.store.increment(
+            "cookies", guild_id, user_id, -1, minimum=0
+        )
+        return remaining is not None
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
@@ -103,7 +88,12 @@ class CookiesCog(commands.Cog):
                     recipients.append(ref.author)
 
         words = message.content.lower().split()
-        for member in message.guild.members:
+        if getattr(self.bot, "low_memory", False):
+            members = await self.find_named_members(message.guild, words)
+        else:
+            members = message.guild.members
+
+        for member in members:
             if member == message.author or member.bot:
                 continue
 
@@ -114,7 +104,47 @@ class CookiesCog(commands.Cog):
                 recipients.append(member)
 
         for user in set(recipients):
-            self.add_cookie(message.guild.id, user.id)
+            await self.add_cookie(message.guild.id, user.id)
+
+    async def find_named_members(
+        self, guild: discord.Guild, words: List[str]
+    ) -> List[discord.Member]:
+        now = time.monotonic()
+        members = []
+        to_query = []
+        for word in name_candidates(words, self.pattern, self.max_name_lookups):
+            cached = self.name_cache.get((guild.id, word))
+            if cached and now - cached[0] < self.name_cache_ttl:
+                members.extend(cached[1])
+            else:
+                to_query.append(word)
+
+        if not to_query:
+            return members
+
+        results = await asyncio.gather(
+            # cache=False, otherwise discord.py adds every result to the member
+            # cache regardless of MemberCacheFlags
+            *[
+                guild.query_members(query=word, limit=5, cache=False)
+                for word in to_query
+            ],
+            return_exceptions=True,
+        )
+        for word, result in zip(to_query, results):
+            if isinstance(result, Exception):
+                print(f"failed to look up member '{word}': {result}")
+                continue
+            self.name_cache[(guild.id, word)] = (now, result)
+            members.extend(result)
+
+        if len(self.name_cache) > 1000:
+            self.name_cache = {
+                key: value
+                for key, value in self.name_cache.items()
+                if now - value[0] < self.name_cache_ttl
+            }
+        return members
 
     @app_commands.command(
         name="cookies", description="check how many cookies you or someone else has"
@@ -123,7 +153,7 @@ class CookiesCog(commands.Cog):
         self, interaction: discord.Interaction, user: Optional[discord.Member] = None
     ) -> None:
         target = user or interaction.user
-        count = self.get_cookies(interaction.guild_id, target.id)
+        count = await self.get_cookies(interaction.guild_id, target.id)
 
         if target == interaction.user:
             await interaction.response.send_message(
@@ -136,13 +166,15 @@ class CookiesCog(commands.Cog):
 
     @app_commands.command(name="eat", description="eat one of your cookies")
     async def eat_cookie(self, interaction: discord.Interaction) -> None:
-        if not self.remove_cookie(interaction.guild_id, interaction.user.id):
+        if not await self.remove_cookie(interaction.guild_id, interaction.user.id):
             await interaction.response.send_message(
                 "you don't have any cookies to eat...", ephemeral=True
             )
             return
 
-        remaining = self.get_cookies(interaction.guild_id, interaction.user.id)
+        remaining = await self.get_cookies(
+            interaction.guild_id, interaction.user.id
+        )
         await interaction.response.send_message(
             f"\*munch nom om onomosngon\*\n you have **{remaining}** cookie{'s' if remaining != 1 else ''} left"
         )
@@ -163,16 +195,18 @@ class CookiesCog(commands.Cog):
             )
             return
 
-        if not self.remove_cookie(interaction.guild_id, interaction.user.id):
+        if not await self.remove_cookie(interaction.guild_id, interaction.user.id):
             await interaction.response.send_message(
                 "you don't have any cookies to give...", ephemeral=True
             )
             return
 
-        self.add_cookie(interaction.guild_id, recipient.id)
+        await self.add_cookie(interaction.guild_id, recipient.id)
 
-        giver_remaining = self.get_cookies(interaction.guild_id, interaction.user.id)
-        recipient_total = self.get_cookies(interaction.guild_id, recipient.id)
+        giver_remaining = await self.get_cookies(
+            interaction.guild_id, interaction.user.id
+        )
+        recipient_total = await self.get_cookies(interaction.guild_id, recipient.id)
 
         await interaction.response.send_message(
             f"gave a cookie to {recipient.mention}\n"
@@ -183,7 +217,8 @@ class CookiesCog(commands.Cog):
         name="leaderboard", description="see who has the most cookies"
     )
     async def leaderboard(self, interaction: discord.Interaction) -> None:
-        guild_cookies = self.cookies.get(interaction.guild_id, {})
+        counters = await self.store.counters("cookies", interaction.guild_id)
+        guild_cookies = {int(u): c for u, c in counters.items()}
 
         if not guild_cookies:
             await interaction.response.send_message("no one has any cookies yet...")
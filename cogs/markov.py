@@ -3,7 +3,7 @@ from discord.ext import commands, tasks
 import random
 import json
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 from collections import defaultdict
 
 
@@ -13,29 +13,44 @@ class MarkovCog(commands.Cog):
         self.data_file = Path("data/markov.json")
         self.data_file.parent.mkdir(exist_ok=True)
 
-        self.chains: Dict[int, Dict[str, List[str]]] = defaultdict(
-            lambda: defaultdict(list)
-        )
-        self.load_data()
+        self.store = bot.store
+
+        # chains are pulled out of the store the first time a guild is seen, so
+        # a shard process only holds the guilds it actually serves
+        self.chains: Dict[int, Dict[str, List[str]]] = {}
+        self.dirty: Set[int] = set()
 
         self.random_message.start()
 
-    def load_data(self) -> None:
+    async def cog_load(self) -> None:
+        await self.store.import_once("markov", self.load_data)
+
+    def load_data(self) -> dict:
         if self.data_file.exists():
             try:
                 with open(self.data_file, "r") as f:
-                    data = json.load(f)
-                    for guild_id, chain in data.items():
-                        self.chains[int(guild_id)] = defaultdict(list, chain)
+                    return {"kv": json.load(f)}
             except Exception as e:
                 print(f"failed to load markov data: {e}")
-
-    def save_data(self) -> None:
-        try:
-            with open(self.data_file, "w") as f:
-                json.dump({str(k): dict(v) for k, v in self.chains.items()}, f)
-        except Exception as e:
-            print(f"failed to save markov data: {e}")
+        return {}
+
+    async def get_chain(self, guild_id: int) -> Dict[str, List[str]]:
+        if guild_id not in self.chains:
+            chain = await self.store.get("markov", guild_id, {})
+            self.chains.setdefault(guild_id, defaultdict(list, chain))
+        return self.chains[guild_id]
+
+    async def save_data(self) -> None:
+        for guild_id in list(self.dirty):
+            self.dirty.discard(guild_id)
+            # copy the lists so on_message can keep appending while this is
+            # serialised off the event loop
+            chain = {k: list(v) for k, v in self.chains[guild_id].items()}
+            try:
+                await self.store.set("markov", guild_id, chain)
+            except Exception as e:
+                self.dirty.add(guild_id)
+                print(f"failed to save markov data: {e}")
 
     def is_allowed_channel(self, channel_id: int, guild_id: int) -> bool:
         config_cog = self.bot.get_cog("Config")
@@ -65,12 +80,13 @@ class MarkovCog(commands.Cog):
 
         return True
 
-    def add_message(self, guild_id: int, text: str) -> None:
+    async def add_message(self, guild_id: int, text: str) -> None:
         if not self.is_valid_message(text):
             return
 
         words = text.split()
-        chain = self.chains[guild_id]
+        chain = await self.get_chain(guild_id)
+        self.dirty.add(guild_id)
 
         chain["__START__"].append(words[0])
 
@@ -79,8 +95,10 @@ class MarkovCog(commands.Cog):
 
         chain[words[-1]].append("__END__")
 
-    def generate_message(self, guild_id: int, max_length: int = 50) -> Optional[str]:
-        chain = self.chains.get(guild_id)
+    async def generate_message(
+        self, guild_id: int, max_length: int = 50
+    ) -> Optional[str]:
+        chain = await self.get_chain(guild_id)
         if not chain or "__START__" not in chain:
             return None
 
@@ -119,7 +137,7 @@ class MarkovCog(commands.Cog):
                 content = content.replace(f"<@!{mention.id}>", "")
 
             if not content.strip():
-                response = self.generate_message(message.guild.id)
+                response = await self.generate_message(message.guild.id)
                 if response:
                     try:
                         await message.channel.send(response)
@@ -127,10 +145,10 @@ class MarkovCog(commands.Cog):
                         pass
                 return
 
-        self.add_message(message.guild.id, message.content)
+        await self.add_message(message.guild.id, message.content)
 
         if random.random() < 0.05:
-            self.save_data()
+            await self.save_data()
 
     @tasks.loop(minutes=1)
     async def random_message(self) -> None:
@@ -169,7 +187,7 @@ class MarkovCog(commands.Cog):
                 continue
             channel = random.choice(allowed_channels[:5])
 
-            message = self.generate_message(guild.id)
+            message = await self.generate_message(guild.id)
             if message:
                 try:
                     await channel.send(message)
@@ -180,9 +198,9 @@ class MarkovCog(commands.Cog):
     async def before_random_message(self) -> None:
         await self.bot.wait_until_ready()
 
-    def cog_unload(self) -> None:
+    async def cog_unload(self) -> None:
         self.random_message.cancel()
-        self.save_data()
+        await self.save_data()
 
 
 async def setup(bot: commands.Bot) -> None:
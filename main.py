@@ -1,19 +1,87 @@
 import discord
 from discord.ext import commands
+import asyncio
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from store import Store
+
+started = time.perf_counter()
+startup_measured = False
+load_dotenv()
+
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="dave:", intents=intents)
+# DAVE_LOW_MEMORY keeps the members intent (needed for query_members) but stops
+# caching members and chunking guilds. cookies looks names up on demand instead
+low_memory = os.getenv("DAVE_LOW_MEMORY", "").lower() in ("1", "true", "yes")
+bot_options = {}
+if low_memory:
+    bot_options["member_cache_flags"] = discord.MemberCacheFlags.none()
+    bot_options["chunk_guilds_at_startup"] = False
+
+
+def parse_shard_ids(value: str) -> list:
+    shard_ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = part.split("-", 1)
+            shard_ids.extend(range(int(start), int(end) + 1))
+        elif part:
+            shard_ids.append(int(part))
+    return shard_ids
+
+
+# DAVE_SHARD_COUNT turns on sharding. leave DAVE_SHARD_IDS unset to run every
+# shard in this process, or give each process its own range ("0-3", "4-7")
+shard_count = os.getenv("DAVE_SHARD_COUNT")
+shard_ids = os.getenv("DAVE_SHARD_IDS")
+
+if shard_count:
+    bot = commands.AutoShardedBot(
+        command_prefix="dave:",
+        intents=intents,
+        shard_count=int(shard_count),
+        shard_ids=parse_shard_ids(shard_ids) if shard_ids else None,
+        **bot_options,
+    )
+else:
+    bot = commands.Bot(command_prefix="dave:", intents=intents, **bot_options)
+
+bot.low_memory = low_memory
+bot.store = Store(os.getenv("DAVE_STORE", "data/dave.db"))
 
 
 @bot.event
 async def on_ready() -> None:
+    global startup_measured
     print(f"logged in as {bot.user}")
+    # on_ready fires again after every reconnect, only the first one is startup
+    if not startup_measured:
+        startup_measured = True
+        print(
+            f"startup (measured once): ready after"
+            f" {time.perf_counter() - started:.1f}s"
+            f" (low memory mode {'on' if low_memory else 'off'})"
+        )
+        if resource:
+            # ru_maxrss is in kilobytes on linux
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"startup (measured once): peak rss {peak:.1f} MiB")
+    # every shard process would otherwise push the same command tree
+    own_shards = getattr(bot, "shard_ids", None)
+    if own_shards and 0 not in own_shards:
+        return
     await bot.tree.sync()
     print("slash commands synced")
 
@@ -34,16 +102,20 @@ async def load_cogs() -> None:
 
 
 async def main() -> None:
-    load_dotenv()
     token = os.getenv("DISCORD_TOKEN")
     if not token:
         raise ValueError("DISCORD_TOKEN environment variable is not set")
-    async with bot:
-        await load_cogs()
-        await bot.start(token)
+    watcher = asyncio.create_task(bot.store.watch())
+    try:
+        async with bot:
+            await load_cogs()
+            await bot.start(token)
+    finally:
+        # closing the bot unloads the cogs, and markov saves its chains then,
+        # so the store has to outlive it
+        watcher.cancel()
+        bot.store.close()
 
 
 if __name__ == "__main__":
-    import asyncio
-
     asyncio.run(main())
@@ -0,0 +1,63 @@
+import re
+from typing import List
+
+# low memory mode only asks discord about the word right next to a thank-you
+# ("thanks bob", "thank you so much bob", "bob ty"). these get skipped over
+# when looking for it, and interjections like "omg thanks" never count as names
+FILLER_WORDS = {
+    "you", "u", "ya", "yall", "so", "much", "very", "a", "lot", "again",
+    "man", "bro", "dude", "guys", "everyone", "all", "lol", "lmao", "haha",
+    "ok", "okay", "kk", "k", "oh", "ah", "aw", "aww", "yeah", "yes", "hey", "hi",
+    "and", "i", "me", "my", "we", "the", "omg", "omfg", "wow", "well", "welp",
+    "cool", "nice", "great", "awesome", "damn", "dang", "alright", "sure",
+}
+
+# these end the search, since a name won't come straight after them
+STOP_WORDS = {
+    "for", "to", "with", "on", "in", "about", "if", "when", "but", "though",
+    "anyway", "everything", "that", "this", "it",
+}
+
+
+def is_name_like(word: str) -> bool:
+    return 2 <= len(word) <= 32 and not word.startswith("<")
+
+
+def name_candidates(
+    words: List[str], thank_pattern: re.Pattern, limit: int = 2
+) -> List[str]:
+    candidates = []
+
+    def consider(word: str) -> bool:
+        if not is_name_like(word) or word in FILLER_WORDS | STOP_WORDS:
+            return False
+        if thank_pattern.match(word):
+            return False
+        if word not in candidates:
+            candidates.append(word)
+        return True
+
+    for i, word in enumerate(words):
+        if not thank_pattern.match(word):
+            continue
+
+        found = False
+        stopped = False
+        for j in range(i + 1, len(words)):
+            after = words[j]
+            if stopped:
+                # "thanks for the help, bob" still names someone after a comma
+                if words[j - 1].endswith(",") and consider(after):
+                    found = True
+                    break
+            elif after in STOP_WORDS or thank_pattern.match(after):
+                stopped = True
+            elif after not in FILLER_WORDS:
+                found = consider(after)
+                break
+
+        # only look backwards ("bob ty") when nothing after the thank-you fit
+        if not found and i > 0:
+            consider(words[i - 1])
+
+    return candidates[:limit]
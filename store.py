@@ -0,0 +1,267 @@
+import asyncio
+import inspect
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+# state shared by every shard process on this machine. each process opens its
+# own connection to the same sqlite file, counters are bumped inside sqlite
+# rather than in a python dict, and writes made by other processes are handed
+# to subscribers by `watch`.
+#
+# sqlite calls can wait on another process's write lock, so they all run on a
+# single worker thread instead of the event loop. one thread also means the
+# connection never has two transactions going at once.
+class Store:
+    def __init__(self, path: str = "data/dave.db") -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(exist_ok=True)
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.db = sqlite3.connect(
+            self.path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS kv (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE TABLE IF NOT EXISTS counters (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value INTEGER NOT NULL,
+                PRIMARY KEY (namespace, key, field)
+            );
+            CREATE TABLE IF NOT EXISTS changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+            """
+        )
+
+        self.subscribers: Dict[str, List[Callable[[str], Any]]] = {}
+        self.own_changes: Set[int] = set()
+        row = self.db.execute("SELECT MAX(id) FROM changes").fetchone()
+        self.last_change = row[0] or 0
+        self.data_version = self._data_version()
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args))
+
+    def _data_version(self) -> int:
+        return self.db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _notify(self, namespace: str, key: str) -> None:
+        cursor = self.db.execute(
+            "INSERT INTO changes (namespace, key, created) VALUES (?, ?, ?)",
+            (namespace, key, time.time()),
+        )
+        self.own_changes.add(cursor.lastrowid)
+
+    def _get(self, namespace: str, key: Any, default: Any = None) -> Any:
+        row = self.db.execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ?",
+            (namespace, str(key)),
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set(self, namespace: str, key: Any, value: Any) -> None:
+        value = json.dumps(value)
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.execute(
+                "INSERT INTO kv (namespace, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value",
+                (namespace, str(key), value),
+            )
+            self._notify(namespace, str(key))
+
+    def _items(self, namespace: str) -> Dict[str, Any]:
+        rows = self.db.execute(
+            "SELECT key, value FROM kv WHERE namespace = ?", (namespace,)
+        ).fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    def _get_counter(self, namespace: str, key: Any, field: Any) -> int:
+        row = self.db.execute(
+            "SELECT value FROM counters WHERE namespace = ? AND key = ? AND field = ?",
+            (namespace, str(key), str(field)),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _counters(self, namespace: str, key: Any) -> Dict[str, int]:
+        rows = self.db.execute(
+            "SELECT field, value FROM counters WHERE namespace = ? AND key = ?",
+            (namespace, str(key)),
+        ).fetchall()
+        return dict(rows)
+
+    def _increment(
+        self,
+        namespace: str,
+        key: Any,
+        field: Any,
+        amount: int,
+        minimum: Optional[int],
+    ) -> Optional[int]:
+        key, field = str(key), str(field)
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            value = self._get_counter(namespace, key, field) + amount
+            if minimum is not None and value < minimum:
+                return None
+
+            self.db.execute(
+                "INSERT INTO counters (namespace, key, field, value) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (namespace, key, field) "
+                "DO UPDATE SET value = excluded.value",
+                (namespace, key, field, value),
+            )
+            self._notify(namespace, key)
+        return value
+
+    def _import_once(self, namespace: str, loader: Callable[[], Any]) -> None:
+        marker = f"imported:{namespace}"
+        if self._get("meta", marker):
+            return
+
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            row = self.db.execute(
+                "SELECT 1 FROM kv WHERE namespace = 'meta' AND key = ?", (marker,)
+            ).fetchone()
+            if row:
+                return
+
+            data = loader() or {}
+            self.db.executemany(
+                "INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)",
+                [
+                    (namespace, str(k), json.dumps(v))
+                    for k, v in data.get("kv", {}).items()
+                ],
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO counters (namespace, key, field, value) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (namespace, str(k), str(f), int(c))
+                    for k, fields in data.get("counters", {}).items()
+                    for f, c in fields.items()
+                ],
+            )
+            self.db.execute(
+                "INSERT INTO kv (namespace, key, value) VALUES ('meta', ?, 'true')",
+                (marker,),
+            )
+
+    def _changes(self) -> List[Tuple[str, str]]:
+        version = self._data_version()
+        if version == self.data_version:
+            # nobody else has committed, so everything past last_change is ours
+            if self.own_changes:
+                self.last_change = max(self.own_changes)
+                self.own_changes.clear()
+            return []
+        self.data_version = version
+
+        rows = self.db.execute(
+            "SELECT id, namespace, key FROM changes WHERE id > ? ORDER BY id",
+            (self.last_change,),
+        ).fetchall()
+        changes = []
+        for change_id, namespace, key in rows:
+            self.last_change = change_id
+            if change_id in self.own_changes:
+                self.own_changes.discard(change_id)
+                continue
+            changes.append((namespace, key))
+        return changes
+
+    def _prune(self, max_age: float) -> None:
+        self.db.execute(
+            "DELETE FROM changes WHERE created < ?", (time.time() - max_age,)
+        )
+
+    async def get(self, namespace: str, key: Any, default: Any = None) -> Any:
+        return await self._run(self._get, namespace, key, default)
+
+    async def set(self, namespace: str, key: Any, value: Any) -> None:
+        await self._run(self._set, namespace, key, value)
+
+    async def items(self, namespace: str) -> Dict[str, Any]:
+        return await self._run(self._items, namespace)
+
+    async def get_counter(self, namespace: str, key: Any, field: Any) -> int:
+        return await self._run(self._get_counter, namespace, key, field)
+
+    async def counters(self, namespace: str, key: Any) -> Dict[str, int]:
+        return await self._run(self._counters, namespace, key)
+
+    async def increment(
+        self,
+        namespace: str,
+        key: Any,
+        field: Any,
+        amount: int = 1,
+        minimum: Optional[int] = None,
+    ) -> Optional[int]:
+        # returns None instead of going below `minimum`, so two processes
+        # can't both spend the last cookie
+        return await self._run(self._increment, namespace, key, field, amount, minimum)
+
+    async def import_once(self, namespace: str, loader: Callable[[], Any]) -> None:
+        # pulls the old data/*.json files in exactly once, even with several
+        # processes starting at the same time. loader returns
+        # {"kv": {key: value}, "counters": {key: {field: value}}}
+        await self._run(self._import_once, namespace, loader)
+
+    def subscribe(self, namespace: str, callback: Callable[[str], Any]) -> None:
+        self.subscribers.setdefault(namespace, []).append(callback)
+
+    def unsubscribe(self, namespace: str, callback: Callable[[str], Any]) -> None:
+        if callback in self.subscribers.get(namespace, []):
+            self.subscribers[namespace].remove(callback)
+
+    async def poll(self) -> None:
+        for namespace, key in await self._run(self._changes):
+            for callback in self.subscribers.get(namespace, []):
+                try:
+                    result = callback(key)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    print(f"store subscriber for {namespace} failed: {e}")
+
+    async def prune(self, max_age: float = 3600) -> None:
+        await self._run(self._prune, max_age)
+
+    async def watch(self, interval: float = 1.0, prune_every: float = 300) -> None:
+        last_prune = time.monotonic()
+        while True:
+            try:
+                await self.poll()
+                if time.monotonic() - last_prune >= prune_every:
+                    await self.prune()
+                    last_prune = time.monotonic()
+            except Exception as e:
+                print(f"store watch failed: {e}")
+            await asyncio.sleep(interval)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.db.close()
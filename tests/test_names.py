@@ -0,0 +1,36 @@
+import re
+
+import pytest
+
+from names import name_candidates
+
+THANKS = re.compile(r"\bthank|\bthanks|\bthx|\bty\b|\btysm", re.IGNORECASE)
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("thanks bob", ["bob"]),
+        ("thank you so much bob", ["bob"]),
+        ("bob ty", ["bob"]),
+        ("thanks, bob", ["bob"]),
+        ("thanks for the help, bob", ["bob"]),
+        ("thanks for the help bob", []),
+        ("thanks for helping with the code", []),
+        ("omg thanks", []),
+        ("ok thanks", []),
+        ("thanks", []),
+        ("thanks <@123>", []),
+        ("alice thanks bob", ["bob"]),
+        ("thx alice and tysm bob", ["alice", "bob"]),
+        ("thanks bob and thanks bob", ["bob"]),
+    ],
+)
+def test_name_candidates(message, expected):
+    assert name_candidates(message.lower().split(), THANKS) == expected
+
+
+def test_name_candidates_limit():
+    words = "thanks alice thanks bob thanks carol".split()
+    assert name_candidates(words, THANKS) == ["alice", "bob"]
+    assert name_candidates(words, THANKS, limit=3) == ["alice", "bob", "carol"]
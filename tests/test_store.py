@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+import pytest
+
+from store import Store
+
+
+@pytest.fixture
+def stores(tmp_path):
+    path = tmp_path / "dave.db"
+    first, second = Store(path), Store(path)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_increment_never_goes_below_minimum(stores):
+    first, second = stores
+
+    async def run():
+        await first.increment("cookies", 1, 2, 5)
+        results = await asyncio.gather(
+            *[
+                store.increment("cookies", 1, 2, -1, minimum=0)
+                for _ in range(10)
+                for store in stores
+            ]
+        )
+        return results, await second.get_counter("cookies", 1, 2)
+
+    results, remaining = asyncio.run(run())
+    assert len([r for r in results if r is not None]) == 5
+    assert results.count(None) == 15
+    assert remaining == 0
+
+
+def test_import_once_runs_loader_once_across_processes(stores):
+    calls = []
+    lock = threading.Lock()
+
+    def loader():
+        with lock:
+            calls.append(1)
+        return {"kv": {"7": {"markov_channels": [1]}}, "counters": {"1": {"2": 3}}}
+
+    async def run():
+        await asyncio.gather(*[store.import_once("config", loader) for store in stores])
+        await asyncio.gather(*[store.import_once("config", loader) for store in stores])
+        first, second = stores
+        return await second.items("config"), await first.counters("config", 1)
+
+    items, counters = asyncio.run(run())
+    assert len(calls) == 1
+    assert items == {"7": {"markov_channels": [1]}}
+    assert counters == {"2": 3}
+
+
+def test_poll_skips_own_changes_and_reports_others(stores):
+    first, second = stores
+    seen = []
+
+    async def on_change(key):
+        seen.append(key)
+
+    async def run():
+        first.subscribe("config", on_change)
+        await first.set("config", 1, {})
+        await first.poll()
+        await second.set("config", 2, {})
+        await first.set("config", 3, {})
+        await first.poll()
+        await first.poll()
+
+    asyncio.run(run())
+    assert seen == ["2"]
+
+
+def test_prune_drops_old_changes_without_other_writers(stores):
+    first, _ = stores
+
+    async def run():
+        await first.increment("cookies", 1, 2)
+        await first.poll()
+        await first.prune(max_age=0)
+        return first.db.execute("SELECT COUNT(*) FROM changes").fetchone()[0]
+
+    assert asyncio.run(run()) == 0